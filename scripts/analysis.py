@@ -1,7 +1,10 @@
 import argparse
 import json
 import logging
+import os
 import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Set
 
@@ -13,6 +16,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Task running all tasks in one eval, and its metrics that are not per task
+COMBINED_TASK = "afantasia"
+AGGREGATE_METRICS = {"accuracy", "stderr", COMBINED_TASK}
+
+# Version of the index of parsed logs, bumped when the rows it caches change
+INDEX_VERSION = 1
+INDEX_NAME = ".analysis-index.json"
+
 
 def parse_args() -> argparse.Namespace:
     """Parse command line arguments."""
@@ -20,45 +31,209 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--logs-dir",
         default="logs",
-        help="Directory containing log subdirs with logs.json (default: logs)",
+        help="Directory containing logs.json listings or .eval logs (default: logs)",
+    )
+    parser.add_argument(
+        "--index",
+        default=None,
+        help=f"Index of already parsed logs (default: <logs-dir>/{INDEX_NAME})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Processes parsing new or changed logs (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--breakdown",
+        default=None,
+        metavar="FIELD",
+        help="Print accuracy per model against a sample field (e.g. moves_played) "
+        "from the sample store, instead of the leaderboard",
+    )
+    parser.add_argument(
+        "--samples-store",
+        default="samples",
+        help="Parquet store written by export_samples.py (default: samples)",
+    )
+    parser.add_argument(
+        "--task",
+        default=None,
+        help="Only break down samples of this task (default: all with the field)",
+    )
+    parser.add_argument(
+        "--bins",
+        type=int,
+        default=None,
+        help="Group numeric field values into this many equal-width bins",
     )
     return parser.parse_args()
 
 
-def parse_logs(logs_path: Path) -> pd.DataFrame:
-    """Parse a single logs.json file."""
+def log_rows(log: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Return the (model, task, score) rows of a single eval log."""
+    if log.get("status") != "success":
+        return []
+
+    model = log["eval"]["model"]
+    model_short = model.split("/")[-1]
+
+    task_registry_name = log["eval"]["task_registry_name"]
+    task = task_registry_name.split("/")[-1]
+
+    if task == COMBINED_TASK:
+        # The combined task reports the accuracy of each of its tasks
+        try:
+            metrics = log["results"]["scores"][0]["metrics"]
+        except (KeyError, IndexError):
+            metrics = {}
+        return [
+            {"model": model_short, "task": name, "score": metric["value"]}
+            for name, metric in metrics.items()
+            if name not in AGGREGATE_METRICS
+        ]
+
     try:
-        with open(logs_path, "r") as f:
-            logs = json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError) as e:
+        score = log["results"]["scores"][0]["metrics"]["accuracy"]["value"]
+    except (KeyError, IndexError):
+        score = None
+
+    return [
+        {
+            "model": model_short,
+            "task": task,
+            "score": score,
+        }
+    ]
+
+
+def read_eval_header(eval_path: Path) -> Dict[str, Any]:
+    """Read the header of an Inspect .eval log.
+
+    A .eval log is a zip archive; only its header.json entry (eval spec,
+    results and status) is decompressed, never the samples.
+    """
+    with zipfile.ZipFile(eval_path) as archive:
+        try:
+            with archive.open("header.json") as f:
+                return json.load(f)
+        except KeyError:
+            # Logs of unfinished runs have no header yet
+            return {"status": "started"}
+
+
+def read_logs(logs_path: Path) -> List[Dict[str, Any]]:
+    """Read the eval logs of a logs.json listing or a single .eval file."""
+    if logs_path.suffix == ".eval":
+        return [read_eval_header(logs_path)]
+
+    with open(logs_path, "r") as f:
+        return list(json.load(f).values())
+
+
+def parse_logs(logs_path: Path) -> List[Dict[str, Any]]:
+    """Parse a single log file into its mean score per (model, task)."""
+    try:
+        logs = read_logs(logs_path)
+    except (json.JSONDecodeError, zipfile.BadZipFile, OSError) as e:
         logger.warning(f"Failed to read {logs_path}: {e}")
-        return pd.DataFrame()
+        return []
 
     results: List[Dict[str, Any]] = []
-    for _, log in logs.items():
-        if log.get("status") != "success":
-            continue
+    for log in logs:
+        results.extend(log_rows(log))
+
+    # Average repeated runs within the file, so each file counts once
+    df = pd.DataFrame(results, columns=["model", "task", "score"]).dropna()
+    df = df.groupby(["model", "task"], as_index=False)["score"].mean()
+    return df.to_dict("records")
 
-        model = log["eval"]["model"]
-        model_short = model.split("/")[-1]
 
-        task_registry_name = log["eval"]["task_registry_name"]
-        task = task_registry_name.split("/")[-1]
+def find_logs(logs_dir: Path) -> List[Path]:
+    """Find the logs.json listings and .eval logs under a directory.
 
+    The .eval logs of a directory with a logs.json listing are skipped, as the
+    listing already holds their headers.
+    """
+    listings = sorted(logs_dir.rglob("logs.json"))
+    listed_dirs = {path.parent for path in listings}
+    eval_logs = [
+        path for path in logs_dir.rglob("*.eval") if path.parent not in listed_dirs
+    ]
+    return sorted(listings + eval_logs)
+
+
+def load_index(index_path: Path, version: int = INDEX_VERSION) -> Dict[str, Any]:
+    """Load the index entries of parsed logs, or none if missing or outdated."""
+    try:
+        with open(index_path, "r") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        logger.warning(f"Ignoring unreadable index {index_path}: {e}")
+        return {}
+
+    if index.get("version") != version:
+        return {}
+    return index.get("entries", {})
+
+
+def save_index(
+    index_path: Path, entries: Dict[str, Any], version: int = INDEX_VERSION
+) -> None:
+    """Write the index atomically, so an interrupted run can't corrupt it."""
+    tmp_path = index_path.with_name(index_path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"version": version, "entries": entries}, f)
+    os.replace(tmp_path, index_path)
+
+
+def collect_rows(
+    logs_dir: Path, logs_paths: List[Path], index_path: Path, workers: int
+) -> List[Dict[str, Any]]:
+    """Return the rows of all logs, parsing only those new or changed.
+
+    Logs are looked up in the index by path, modification time and size; the
+    others are parsed across a process pool and their rows added to the index.
+    """
+    index = load_index(index_path)
+
+    entries: Dict[str, Any] = {}
+    stale: List[tuple] = []
+    for logs_path in logs_paths:
+        key = logs_path.relative_to(logs_dir).as_posix()
+        stat = logs_path.stat()
+        entry = index.get(key)
+        if (
+            entry is not None
+            and entry["mtime_ns"] == stat.st_mtime_ns
+            and entry["size"] == stat.st_size
+        ):
+            entries[key] = entry
+        else:
+            entries[key] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+            stale.append((key, logs_path))
+
+    logger.info(f"Parsing {len(stale)} new or changed log files.")
+    if len(stale) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(stale))) as executor:
+            parsed = list(
+                executor.map(parse_logs, [path for _, path in stale], chunksize=16)
+            )
+    else:
+        parsed = [parse_logs(path) for _, path in stale]
+    for (key, _), rows in zip(stale, parsed):
+        entries[key]["rows"] = rows
+
+    # Entries of deleted logs are dropped too
+    if stale or entries.keys() != index.keys():
         try:
-            score = log["results"]["scores"][0]["metrics"]["accuracy"]["value"]
-        except (KeyError, IndexError):
-            score = None
-
-        results.append(
-            {
-                "model": model_short,
-                "task": task,
-                "score": score,
-            }
-        )
+            save_index(index_path, entries)
+        except OSError as e:
+            logger.warning(f"Failed to write index {index_path}: {e}")
 
-    return pd.DataFrame(results)
+    return [row for entry in entries.values() for row in entry["rows"]]
 
 
 def format_dataframe_for_markdown(df: pd.DataFrame) -> pd.DataFrame:
@@ -94,23 +269,49 @@ def format_dataframe_for_markdown(df: pd.DataFrame) -> pd.DataFrame:
     return formatted_df
 
 
-def main() -> None:
-    args = parse_args()
-    logs_dir = Path(args.logs_dir)
+def import_pyarrow():
+    """Import pyarrow, which is only needed for the sample store."""
+    try:
+        import pyarrow
+        import pyarrow.dataset  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            "The sample store requires pyarrow: uv sync --extra dev "
+            "(or pip install pyarrow)"
+        ) from e
+    return pyarrow
+
+
+def read_store(
+    store: Path, columns: List[str], task: Optional[str] = None
+) -> pd.DataFrame:
+    """Read columns of the store into a DataFrame.
+
+    Only task partitions that have all the columns are read, e.g. only chess
+    for `moves_played`.
+    """
+    pa = import_pyarrow()
 
-    if not logs_dir.exists():
-        logger.error(f"Directory '{logs_dir}' does not exist.")
-        sys.exit(1)
+    frames = []
+    for directory in sorted(store.glob("task=*")):
+        task_name = directory.name.split("=", 1)[1]
+        if task is not None and task_name != task:
+            continue
+        dataset = pa.dataset.dataset(directory, format="parquet", partitioning="hive")
+        if not set(columns) <= set(dataset.schema.names):
+            continue
+        df = dataset.to_table(columns=columns).to_pandas()
+        df["task"] = task_name
+        frames.append(df)
 
-    # Find all logs.json files recursively
-    logs_paths = sorted(list(logs_dir.rglob("logs.json")))
-    logger.info(f"Found {len(logs_paths)} log files.")
+    if not frames:
+        return pd.DataFrame(columns=columns + ["task"])
+    return pd.concat(frames, ignore_index=True)
 
-    if not logs_paths:
-        logger.warning(f"No logs.json files found in '{logs_dir}'.")
-        sys.exit(0)
 
-    # Load allowed models
+def load_allowed_models() -> Optional[Set[str]]:
+    """Load the models to report, or None to report all models."""
     allowed_models_path = Path(__file__).parent / "allowed_models.json"
     allowed_models: Optional[Set[str]] = None
     if allowed_models_path.exists():
@@ -127,28 +328,83 @@ def main() -> None:
             f"Allowed models file not found at {allowed_models_path}. "
             "No filtering will be applied."
         )
+    return allowed_models
 
-    data = pd.DataFrame()
-    for logs_path in logs_paths:
-        df = parse_logs(logs_path)
-        if df.empty:
-            continue
 
-        df = df.pivot_table(index="model", columns="task", values="score")
+def breakdown_table(df: pd.DataFrame, field: str, bins: Optional[int]) -> pd.DataFrame:
+    """Tabulate accuracy per model against the values of a sample field."""
+    if bins and pd.api.types.is_numeric_dtype(df[field]):
+        df = df.assign(**{field: pd.cut(df[field], bins)})
+
+    table = df.pivot_table(
+        index=["task", field],
+        columns="model",
+        values="score",
+        aggfunc="mean",
+        observed=True,
+    )
+    table = table.map(lambda val: "" if pd.isna(val) else f"{val * 100:.0f}%")
+    table.insert(0, "n", df.groupby(["task", field], observed=True).size())
+    return table
+
+
+def print_breakdown(args: argparse.Namespace) -> None:
+    """Print accuracy against a field of the samples in the sample store."""
+    df = read_store(
+        Path(args.samples_store), ["model", args.breakdown, "score"], args.task
+    )
+
+    allowed_models = load_allowed_models()
+    if allowed_models is not None:
+        df = df[df["model"].isin(allowed_models)]
 
-        # Filter allowed models
-        if allowed_models is not None:
-            df = df[df.index.isin(allowed_models)]
+    if df.empty:
+        logger.error(
+            f"No samples with field '{args.breakdown}' in {args.samples_store}."
+        )
+        sys.exit(0)
+
+    table = breakdown_table(df, args.breakdown, args.bins).reset_index()
+    table[args.breakdown] = table[args.breakdown].astype(str)
+    print(table.to_markdown(index=False))
+
+
+def main() -> None:
+    args = parse_args()
+    if args.breakdown:
+        print_breakdown(args)
+        return
+
+    logs_dir = Path(args.logs_dir)
+
+    if not logs_dir.exists():
+        logger.error(f"Directory '{logs_dir}' does not exist.")
+        sys.exit(1)
 
-        data = pd.concat([data, df], axis=0)
+    # Find all logs.json listings and .eval logs recursively
+    logs_paths = find_logs(logs_dir)
+    logger.info(f"Found {len(logs_paths)} log files.")
 
-    if data.empty:
+    if not logs_paths:
+        logger.warning(f"No logs.json or .eval files found in '{logs_dir}'.")
+        sys.exit(0)
+
+    allowed_models = load_allowed_models()
+
+    index_path = Path(args.index) if args.index else logs_dir / INDEX_NAME
+    rows = collect_rows(logs_dir, logs_paths, index_path, args.workers)
+    df = pd.DataFrame(rows, columns=["model", "task", "score"])
+
+    # Filter allowed models
+    if allowed_models is not None:
+        df = df[df["model"].isin(allowed_models)]
+
+    if df.empty:
         logger.error("No valid data found in logs.")
         sys.exit(0)
 
-    # Handle duplicates if any (keep the last one or average?)
-    # Grouping by index (model) and taking mean handles duplicate model entries from multiple log files
-    data = data.groupby(level=0).mean()
+    # Average each model over log files (each file already averages its runs)
+    data = df.pivot_table(index="model", columns="task", values="score")
 
     # Convert accuracy to error rate (lower is better, "afantasia")
     data = 1 - data
@@ -0,0 +1,82 @@
+"""Benchmark chess position generation against the per-ply SAN playout.
+
+Times `generate_random_position` and a copy of the playout it replaced, which
+rendered every ply to SAN, and prints positions per second and the speedup.
+"""
+
+import argparse
+import random
+import time
+
+import chess
+
+from afantasia.generators.chess import generate_random_position
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark chess position generation (positions per second)"
+    )
+    parser.add_argument(
+        "--num-positions",
+        type=int,
+        default=1000,
+        help="Number of positions to generate per run (default: 1000)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    return parser.parse_args()
+
+
+def legacy_random_position(
+    rng: random.Random, min_moves: int = 25, max_moves: int = 80
+):
+    """Per-ply SAN playout, as generate_random_position worked before the fast path."""
+    board = chess.Board()
+    moves_played = 0
+    move_history = []
+    target_moves = rng.randint(min_moves, max_moves)
+
+    while moves_played < target_moves and board.legal_moves:
+        legal_moves = list(board.legal_moves)
+        move = rng.choice(legal_moves)
+        san_move = board.san(move)
+        board.push(move)
+        if moves_played % 2 == 0:
+            move_history.append(f"{moves_played // 2 + 1}. {san_move}")
+        else:
+            move_history.append(san_move)
+        moves_played += 1
+
+    return {
+        "fen": board.fen(),
+        "move_history": " ".join(move_history),
+        "legal_moves": [board.san(move) for move in board.legal_moves],
+        "moves_played": moves_played,
+    }
+
+
+def positions_per_second(generate, num_positions: int, seed: int) -> float:
+    """Time `generate(rng)` over `num_positions` positions."""
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for _ in range(num_positions):
+        generate(rng)
+    return num_positions / (time.perf_counter() - start)
+
+
+def main() -> None:
+    args = parse_args()
+
+    before = positions_per_second(legacy_random_position, args.num_positions, args.seed)
+    after = positions_per_second(
+        lambda rng: generate_random_position(rng=rng), args.num_positions, args.seed
+    )
+
+    print(f"before: {before:,.0f} positions/s")
+    print(f"after:  {after:,.0f} positions/s")
+    print(f"speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Export the samples of eval logs to a columnar store.
+
+Flattens every sample of the successful .eval logs under a directory (model,
+task, sample id, epoch, metadata fields, answer, score, tokens and latency)
+into a Parquet store partitioned by task and model:
+
+    <store>/task=<task>/model=<model>/<log>-<hash of its path>.parquet
+
+Each task partition has the metadata fields of its task as columns, so
+breakdowns such as accuracy vs `moves_played` are columnar queries (see
+`analysis.py --breakdown`). Exports are incremental: logs already exported are
+skipped unless their modification time or size changed, and the files of
+changed, deleted or renamed logs are removed. Requires pyarrow.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from analysis import (
+    COMBINED_TASK,
+    import_pyarrow,
+    load_index,
+    read_eval_header,
+    save_index,
+)
+from inspect_ai.log import read_eval_log_samples
+from inspect_ai.scorer import value_to_float
+
+logger = logging.getLogger(__name__)
+
+# Version of the export layout, bumped when the columns change
+STORE_VERSION = 2
+MANIFEST_NAME = "_exported.json"
+
+# Columns derived from metadata fields, e.g. for accuracy vs word length
+DERIVED_FIELDS = {"word": ("word_length", len)}
+
+# Metadata field holding the task of a sample of the combined task
+TASK_FIELD = "task"
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Export the samples of eval logs to a Parquet store"
+    )
+    parser.add_argument(
+        "--logs-dir",
+        default="logs",
+        help="Directory containing .eval logs (default: logs)",
+    )
+    parser.add_argument(
+        "--store",
+        default="samples",
+        help="Directory of the Parquet store (default: samples)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Processes exporting new or changed logs (default: number of CPUs)",
+    )
+    return parser.parse_args()
+
+
+def sample_row(sample, log: str) -> Dict[str, Any]:
+    """Flatten an eval sample into a row of the store.
+
+    The model and task are not columns of the files, but partition keys.
+    """
+    score = next(iter(sample.scores.values()), None) if sample.scores else None
+    usage = sample.model_usage.values()
+
+    row: Dict[str, Any] = {
+        "log": log,
+        "sample_id": str(sample.id),
+        "epoch": sample.epoch,
+        "answer": score.answer
+        if score is not None and score.answer is not None
+        else sample.output.completion,
+        "score": value_to_float()(score.value) if score is not None else None,
+        "input_tokens": sum(u.input_tokens for u in usage),
+        "output_tokens": sum(u.output_tokens for u in usage),
+        "total_tokens": sum(u.total_tokens for u in usage),
+        "total_time": sample.total_time,
+        "working_time": sample.working_time,
+    }
+
+    for name, value in (sample.metadata or {}).items():
+        if name == TASK_FIELD:
+            continue
+        # Nested values (e.g. cube states) are kept as JSON strings
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value)
+        row[name] = value
+        if name in DERIVED_FIELDS and isinstance(value, str):
+            derived_name, derive = DERIVED_FIELDS[name]
+            row[derived_name] = derive(value)
+
+    return row
+
+
+def export_log(eval_path: Path, key: str, store: Path) -> Optional[Dict[str, Any]]:
+    """Write the samples of a .eval log to the store, one file per partition.
+
+    Files are named after the log and a hash of `key`, its path relative to
+    the logs directory, so logs with the same name in different directories
+    don't overwrite each other.
+
+    Returns:
+        The number of samples exported (none for unsuccessful runs) and the
+        files written, relative to the store, or None if the log can't be read.
+    """
+    pa = import_pyarrow()
+
+    try:
+        header = read_eval_header(eval_path)
+        if header.get("status") != "success":
+            return {"samples": 0, "files": []}
+
+        model = header["eval"]["model"].split("/")[-1]
+        log_task = header["eval"]["task_registry_name"].split("/")[-1]
+
+        partitions: Dict[str, List[Dict[str, Any]]] = {}
+        for sample in read_eval_log_samples(eval_path):
+            task = log_task
+            if log_task == COMBINED_TASK:
+                task = (sample.metadata or {}).get(TASK_FIELD, log_task)
+            partitions.setdefault(task, []).append(sample_row(sample, key))
+    except (json.JSONDecodeError, zipfile.BadZipFile, OSError) as e:
+        logger.warning(f"Failed to read {eval_path}: {e}")
+        return None
+
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    files = []
+    for task, rows in partitions.items():
+        directory = store / f"task={task}" / f"model={model}"
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{eval_path.stem}-{digest}.parquet"
+        pa.parquet.write_table(pa.Table.from_pylist(rows), path)
+        files.append(path.relative_to(store).as_posix())
+
+    return {"samples": sum(len(rows) for rows in partitions.values()), "files": files}
+
+
+def prune_store(store: Path, exported: Dict[str, Dict[str, Any]]) -> int:
+    """Remove the files of the store that belong to no exported log.
+
+    Returns:
+        The number of files removed.
+    """
+    kept = {file for entry in exported.values() for file in entry.get("files", [])}
+    removed = 0
+    for path in store.rglob("*.parquet"):
+        if path.relative_to(store).as_posix() not in kept:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def export_logs(
+    logs_dir: Path, store: Path, workers: int = 1
+) -> Dict[str, Dict[str, Any]]:
+    """Export the new or changed .eval logs under a directory to the store.
+
+    Logs no longer under the directory are dropped from the store, and logs
+    that can't be read are skipped (and retried on the next export).
+
+    Returns:
+        The manifest of exported logs, keyed by path relative to `logs_dir`.
+    """
+    import_pyarrow()
+    store.mkdir(parents=True, exist_ok=True)
+    manifest_path = store / MANIFEST_NAME
+    exported = load_index(manifest_path, STORE_VERSION)
+
+    current: Dict[str, Dict[str, Any]] = {}
+    stale = []
+    for eval_path in sorted(logs_dir.rglob("*.eval")):
+        key = eval_path.relative_to(logs_dir).as_posix()
+        stat = eval_path.stat()
+        entry = exported.get(key)
+        if (
+            entry is not None
+            and entry["mtime_ns"] == stat.st_mtime_ns
+            and entry["size"] == stat.st_size
+        ):
+            current[key] = entry
+        else:
+            current[key] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+            stale.append((key, eval_path))
+
+    logger.info(f"Exporting {len(stale)} new or changed logs to {store}.")
+    keys = [key for key, _ in stale]
+    paths = [path for _, path in stale]
+    if len(stale) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(stale))) as executor:
+            results = list(executor.map(export_log, paths, keys, [store] * len(paths)))
+    else:
+        results = [export_log(path, key, store) for key, path in stale]
+
+    for key, result in zip(keys, results):
+        if result is None:
+            del current[key]
+        else:
+            current[key].update(result)
+
+    # Files of changed logs that no longer have samples of a partition, and of
+    # deleted or renamed logs
+    removed = prune_store(store, current)
+    if removed:
+        logger.info(f"Removed {removed} files of changed or deleted logs.")
+    if stale or current.keys() != exported.keys():
+        save_index(manifest_path, current, STORE_VERSION)
+
+    return current
+
+
+def main() -> None:
+    args = parse_args()
+
+    exported = export_logs(Path(args.logs_dir), Path(args.store), args.workers)
+    num_samples = sum(entry.get("samples", 0) for entry in exported.values())
+    print(f"{num_samples} samples of {len(exported)} logs in {args.store}")
+
+
+if __name__ == "__main__":
+    main()
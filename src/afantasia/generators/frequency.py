@@ -0,0 +1,153 @@
+"""Persistent word frequency tables for the A-FaNTasia Benchmark.
+
+Counting every word of the Brown corpus takes seconds, so the counts are
+written once to a compact table in the user cache directory and memory-mapped
+on later runs. A table holds the words sorted by their UTF-8 bytes, so a count
+is found by binary search without loading the table into memory.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from bisect import bisect_left
+
+from nltk import FreqDist
+from nltk.corpus import brown
+
+from afantasia.generators.profiling import count, timer
+
+# Table layout: header (magic, format version, number of words), then the
+# little-endian uint32 byte offset of each word in the word blob plus one end
+# offset, the uint32 count of each word, and the concatenated words.
+TABLE_MAGIC = b"AFWF"
+TABLE_VERSION = 1
+TABLE_HEADER = struct.Struct("<4sII")
+UINT32 = struct.Struct("<I")
+
+
+def cache_dir():
+    """Return the directory for persistent caches, creating it if needed.
+
+    Uses $AFANTASIA_CACHE_DIR if set, otherwise $XDG_CACHE_HOME/afantasia or
+    ~/.cache/afantasia.
+    """
+    path = os.environ.get("AFANTASIA_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+        "afantasia",
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def write_frequency_table(path, counts):
+    """Write a word to count mapping as a frequency table.
+
+    The table is written to a temporary file and moved into place, so readers
+    never see a partial table.
+    """
+    words = sorted(word.encode("utf-8") for word in counts)
+
+    offsets = [0]
+    for word in words:
+        offsets.append(offsets[-1] + len(word))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile("wb", dir=directory, delete=False) as f:
+        f.write(TABLE_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, len(words)))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write(
+            struct.pack(f"<{len(words)}I", *(counts[w.decode("utf-8")] for w in words))
+        )
+        f.write(b"".join(words))
+    os.replace(f.name, path)
+
+
+class FrequencyTable:
+    """Read-only, memory-mapped word frequency table.
+
+    Indexing with a word returns its count, or 0 if it is not in the table,
+    like `FreqDist`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._size = TABLE_HEADER.unpack_from(self._data)
+        if magic != TABLE_MAGIC or version != TABLE_VERSION:
+            raise ValueError(f"Not a version {TABLE_VERSION} frequency table: {path}")
+
+        self._offsets_start = TABLE_HEADER.size
+        self._counts_start = self._offsets_start + (self._size + 1) * UINT32.size
+        self._words_start = self._counts_start + self._size * UINT32.size
+        self._words = SortedWords(self)
+
+    def __len__(self):
+        return self._size
+
+    def _uint32(self, start, i):
+        return UINT32.unpack_from(self._data, start + i * UINT32.size)[0]
+
+    def word(self, i):
+        """Return the UTF-8 bytes of the `i`-th word in sorted order."""
+        start = self._words_start + self._uint32(self._offsets_start, i)
+        end = self._words_start + self._uint32(self._offsets_start, i + 1)
+        return self._data[start:end]
+
+    def __getitem__(self, word):
+        key = word.encode("utf-8")
+        i = bisect_left(self._words, key)
+        if i < self._size and self.word(i) == key:
+            return self._uint32(self._counts_start, i)
+        return 0
+
+    def close(self):
+        self._data.close()
+
+
+class SortedWords:
+    """Sequence view of the sorted words of a table, for binary search."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, i):
+        return self.table.word(i)
+
+
+def corpus_key(corpus):
+    """Return a key identifying an NLTK corpus by its location and file contents.
+
+    The key changes whenever the corpus is moved, a file is added or removed, or
+    a file changes size.
+    """
+    digest = hashlib.sha256(str(corpus.root).encode("utf-8"))
+    for fileid in corpus.fileids():
+        digest.update(f"\0{fileid}\0{corpus.abspath(fileid).file_size()}".encode())
+    return digest.hexdigest()[:16]
+
+
+def load_brown_frequencies():
+    """Return the lowercased word frequencies of the Brown corpus.
+
+    The table is cached on disk keyed by the corpus identity, so the corpus is
+    only tokenized and counted the first time.
+    """
+    path = os.path.join(cache_dir(), f"brown-{corpus_key(brown)}.v{TABLE_VERSION}.freq")
+
+    if not os.path.exists(path):
+        print("Building frequency distribution from Brown corpus...")
+        with timer("spell.count_brown"):
+            freq_dist = FreqDist(w.lower() for w in brown.words())
+        write_frequency_table(path, freq_dist)
+        print(f"Cached {len(freq_dist)} word frequencies in {path}")
+        count("spell.frequency_cache_misses")
+    else:
+        count("spell.frequency_cache_hits")
+
+    return FrequencyTable(path)
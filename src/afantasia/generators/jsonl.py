@@ -0,0 +1,86 @@
+"""Streaming JSON Lines dataset files for the A-FaNTasia Benchmark.
+
+A JSONL dataset holds one test case per line, so it can be written while the
+cases are generated and read back one case at a time. Files ending in ".gz"
+are gzip-compressed and files ending in ".zst" are zstd-compressed (this
+needs the optional `zstandard` package).
+"""
+
+import gzip
+import json
+import os
+from contextlib import suppress
+
+from afantasia.generators.profiling import timer
+
+JSONL_SUFFIXES = (".jsonl", ".jsonl.gz", ".jsonl.zst")
+
+
+def is_jsonl(path):
+    """Return whether a path names a (possibly compressed) JSONL dataset."""
+    return str(path).lower().endswith(JSONL_SUFFIXES)
+
+
+def open_text(path, mode="r", compression=None):
+    """Open a dataset file as text, compressed according to its extension.
+
+    Args:
+        path: File to open.
+        mode: "r" to read or "w" to write.
+        compression: "gz", "zst" or None, overriding the extension of `path`.
+    """
+    if compression is None:
+        compression = str(path).lower().rpartition(".")[2]
+
+    if compression == "gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+
+    if compression == "zst":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError(
+                "Reading or writing .zst datasets requires the zstandard package"
+            ) from e
+        return zstandard.open(path, mode + "t", encoding="utf-8")
+
+    return open(path, mode, encoding="utf-8")
+
+
+def write_jsonl(records, path):
+    """Stream records to a JSONL file, one per line.
+
+    Records are written as they are produced, so `records` can be a generator
+    of any length. The file is written to a temporary file and moved into
+    place, so readers never see a partial dataset.
+
+    Returns:
+        The number of records written.
+    """
+    compression = str(path).lower().rpartition(".")[2]
+    temp_path = f"{path}.{os.getpid()}.tmp"
+
+    num_records = 0
+    try:
+        with open_text(temp_path, "w", compression=compression) as f:
+            for record in records:
+                with timer("write"):
+                    f.write(json.dumps(record))
+                    f.write("\n")
+                num_records += 1
+        os.replace(temp_path, path)
+    except BaseException:
+        # The temporary file doesn't exist if it couldn't be opened
+        with suppress(FileNotFoundError):
+            os.remove(temp_path)
+        raise
+
+    return num_records
+
+
+def iter_jsonl(path):
+    """Yield the records of a JSONL file one at a time."""
+    with open_text(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,124 @@
+"""Opt-in phase profiling for the A-FaNTasia Benchmark dataset generators.
+
+The generators time their phases with `timer` (e.g. playouts, SAN rendering,
+WordNet scanning, writing) and count what they process with `count` (e.g.
+playout plies, retries on terminal positions, candidates rejected by each
+filter). Both do nothing until profiling is switched on with `profiling`,
+which collects the timers and counters of the run and writes them to a JSON
+report, optionally with a cProfile dump for finding hot spots below the phase
+level.
+
+Timers are inclusive, so a phase nested in another is counted in both. Only
+the calling process is profiled; with worker processes, their work shows up as
+time spent in the phase that waits for them.
+"""
+
+import cProfile
+import json
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Profile collecting timers and counters, or None when profiling is off
+active = None
+
+
+class Profile:
+    """Timers and counters collected during a profiled run."""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = Counter()
+        self.counters = Counter()
+        self.start_time = time.perf_counter()
+
+    def report(self):
+        """Return the timers and counters, slowest phases first."""
+        timers = {
+            name: {"seconds": seconds, "calls": self.calls[name]}
+            for name, seconds in sorted(
+                self.seconds.items(), key=lambda item: item[1], reverse=True
+            )
+        }
+        return {
+            "command": sys.argv,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "wall_seconds": time.perf_counter() - self.start_time,
+            "timers": timers,
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+
+@contextmanager
+def timer(name):
+    """Add the time spent in the block to the phase `name`."""
+    if active is None:
+        yield
+        return
+
+    profile = active
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.seconds[name] += time.perf_counter() - start
+        profile.calls[name] += 1
+
+
+def count(name, n=1):
+    """Add `n` to the counter `name`."""
+    if active is not None:
+        active.counters[name] += n
+
+
+@contextmanager
+def profiling(path=None, cprofile_path=None):
+    """Collect the timers and counters of the generators within the block.
+
+    Args:
+        path: JSON file to write the report to when the block exits.
+        cprofile_path: File to dump cProfile statistics to, readable with
+            `pstats` or tools such as snakeviz.
+
+    Yields:
+        The `Profile` being collected.
+    """
+    global active
+
+    previous, active = active, Profile()
+    profile = active
+    profiler = cProfile.Profile() if cprofile_path else None
+    if profiler is not None:
+        profiler.enable()
+
+    try:
+        yield profile
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+        active = previous
+
+        if path is not None:
+            with open(path, "w") as f:
+                json.dump(profile.report(), f, indent=2)
+                f.write("\n")
+            print(f"Profile written to {path}")
+
+
+def add_profiling_args(parser):
+    """Add the --profile and --cprofile options to a generator's CLI."""
+    parser.add_argument(
+        "--profile",
+        default=None,
+        metavar="PATH",
+        help="Write per-phase timers and counters to a JSON file",
+    )
+    parser.add_argument(
+        "--cprofile",
+        default=None,
+        metavar="PATH",
+        help="Dump cProfile statistics to a file",
+    )
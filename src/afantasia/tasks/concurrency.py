@@ -0,0 +1,209 @@
+"""Adaptive per-model concurrency for A-FaNTasia Benchmark tasks.
+
+A fixed `max_connections` under-uses fast providers and pushes strict ones into
+long rate-limit backoffs. Instead, each model gets an AIMD controller: every
+call that comes back promptly raises its concurrency limit by about one per
+round of calls, and a call that was rate limited (Inspect retries rate-limited
+and other retryable errors itself, and counts the retries on the call's model
+event) or was much slower than usual halves it. The limit never exceeds a
+configured ceiling.
+
+Every change of a limit is logged, and the whole trajectory of each model's
+limit is logged once when its task ends. Each sample records in its
+`concurrency_limit` metadata the limit its call ran under.
+"""
+
+import logging
+import time
+from contextlib import nullcontext
+
+import anyio
+from anyio.lowlevel import RunVar
+from inspect_ai.event import ModelEvent
+from inspect_ai.hooks import Hooks, TaskEnd, hooks
+from inspect_ai.log import transcript
+from inspect_ai.solver import Generate, TaskState, solver
+
+from afantasia.tasks.streaming import record_stream, streaming
+
+logger = logging.getLogger(__name__)
+
+# Starting concurrency limit when the task sets no max_connections
+DEFAULT_INITIAL = 5
+
+# Controllers of the current event loop, so each eval run starts afresh
+controllers: RunVar[dict[str, "AIMDController"]] = RunVar(
+    "afantasia_concurrency_controllers"
+)
+
+
+class AIMDController:
+    """Additive-increase, multiplicative-decrease concurrency limit for a model.
+
+    Args:
+        name: Model name, used in log messages.
+        initial: Starting concurrency limit.
+        ceiling: Maximum concurrency limit.
+        floor: Minimum concurrency limit.
+        decrease: Factor applied to the limit on congestion.
+        latency_factor: A call slower than this multiple of the typical latency
+            counts as congestion.
+    """
+
+    def __init__(
+        self,
+        name,
+        initial=DEFAULT_INITIAL,
+        ceiling=50,
+        floor=1,
+        decrease=0.5,
+        latency_factor=3.0,
+    ):
+        self.name = name
+        self.limit = float(min(initial, ceiling))
+        self.ceiling = ceiling
+        self.floor = floor
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+
+        self.in_flight = 0
+        self.latency = None
+        self.last_decrease = 0.0
+        self.start_time = time.monotonic()
+        # (seconds since the start of the run, limit) at each change
+        self.trajectory = [(0.0, int(self.limit))]
+        self.condition = anyio.Condition()
+
+    async def acquire(self):
+        """Wait for a free slot and take it."""
+        async with self.condition:
+            while self.in_flight >= int(self.limit):
+                await self.condition.wait()
+            self.in_flight += 1
+
+    async def release(self, started, latency, retries):
+        """Free a slot and adjust the limit from the call's outcome.
+
+        Args:
+            started: Monotonic time the call was started.
+            latency: Duration of the successful attempt.
+            retries: Number of times the call was retried after a rate limit
+                or other retryable error.
+        """
+        async with self.condition:
+            self.in_flight -= 1
+            congested = retries > 0 or (
+                self.latency is not None
+                and latency > self.latency_factor * self.latency
+            )
+
+            if congested:
+                # Calls started before the last decrease saw the old limit, so
+                # only react once per round of calls
+                if started > self.last_decrease:
+                    self.set_limit(
+                        max(self.floor, self.limit * self.decrease),
+                        "rate limited" if retries > 0 else "slow",
+                    )
+                    self.last_decrease = time.monotonic()
+            else:
+                self.set_limit(min(self.ceiling, self.limit + 1 / self.limit))
+                # Track the typical latency of uncongested calls
+                self.latency = (
+                    latency
+                    if self.latency is None
+                    else 0.9 * self.latency + 0.1 * latency
+                )
+
+            self.condition.notify_all()
+
+    def set_limit(self, limit, reason=None):
+        """Set the limit, logging changes of its integer part."""
+        previous = int(self.limit)
+        self.limit = limit
+        if int(limit) != previous:
+            elapsed = time.monotonic() - self.start_time
+            self.trajectory.append((round(elapsed, 3), int(limit)))
+            logger.info(
+                f"{self.name}: concurrency {previous} -> {int(limit)}"
+                + (f" ({reason})" if reason else "")
+            )
+
+    def log_trajectory(self):
+        """Log the trajectory of the limit so far."""
+        trajectory = ", ".join(
+            f"{limit}@{elapsed}s" for elapsed, limit in self.trajectory
+        )
+        logger.info(f"{self.name}: concurrency trajectory {trajectory}")
+
+
+def call_retries(events):
+    """Return the retries of the model calls among transcript events."""
+    return sum(event.retries or 0 for event in events if isinstance(event, ModelEvent))
+
+
+def get_controller(model_name, initial=DEFAULT_INITIAL, ceiling=50):
+    """Return the controller of a model for the current eval run."""
+    registry = controllers.get(None)
+    if registry is None:
+        registry = {}
+        controllers.set(registry)
+    if model_name not in registry:
+        registry[model_name] = AIMDController(model_name, initial, ceiling)
+    return registry[model_name]
+
+
+@hooks(
+    name="adaptive_concurrency",
+    description="Logs the concurrency trajectory of each model when its task ends.",
+)
+class TrajectoryLogger(Hooks):
+    """Log the trajectory of a task's model once, rather than per sample."""
+
+    async def on_task_end(self, data: TaskEnd) -> None:
+        registry = controllers.get(None)
+        controller = registry and registry.get(data.log.eval.model)
+        if controller:
+            controller.log_trajectory()
+
+
+@solver
+def adaptive_generate(
+    initial: int = DEFAULT_INITIAL, ceiling: int = 50, stream: bool = False
+):
+    """Generate with the concurrency of each model tuned by its AIMD controller.
+
+    The task's `max_connections` should be at least `ceiling`, so that the
+    controller rather than Inspect's fixed connection pool limits concurrency.
+
+    Args:
+        initial: Starting concurrency limit per model.
+        ceiling: Maximum concurrency limit per model.
+        stream: If True, stream the output and cancel the request once the
+            answer line is complete (see `afantasia.tasks.streaming`).
+    """
+
+    async def solve(state: TaskState, generate: Generate) -> TaskState:
+        controller = get_controller(str(state.model), initial, ceiling)
+
+        await controller.acquire()
+        limit = int(controller.limit)
+        num_events = len(transcript().events)
+        started = time.monotonic()
+        # A call that fails or is cancelled counts as rate limited
+        latency, retries = 0.0, 1
+        try:
+            with streaming() if stream else nullcontext() as stats:
+                state = await generate(state)
+            if stats is not None:
+                record_stream(state, stats)
+            latency = state.output.time or time.monotonic() - started
+            retries = call_retries(transcript().events[num_events:])
+        finally:
+            with anyio.CancelScope(shield=True):
+                await controller.release(started, latency, retries)
+
+        state.metadata["concurrency_limit"] = limit
+        return state
+
+    return solve
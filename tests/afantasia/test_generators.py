@@ -0,0 +1,372 @@
+"""Tests for the dataset generators."""
+
+import json
+import pstats
+import random
+import subprocess
+import sys
+
+import chess
+import numpy as np
+import pytest
+
+from afantasia.generators import cube_group
+from afantasia.generators.chess import PositionBank, grow_bank
+from afantasia.generators.chess import generate_dataset as generate_chess_dataset
+from afantasia.generators.chess import (
+    generate_playable_position,
+    play_random_moves,
+)
+from afantasia.generators.chess import iter_dataset as iter_chess_dataset
+from afantasia.generators.chess import save_dataset as save_chess_dataset
+from afantasia.generators.cube import Axis, Color, Cube, Direction, Face
+from afantasia.generators.cube import generate_dataset as generate_cube_dataset
+from afantasia.generators.frequency import FrequencyTable, write_frequency_table
+from afantasia.generators.jsonl import iter_jsonl, write_jsonl
+from afantasia.generators.manifest import content_id, read_manifest
+from afantasia.generators.profiling import profiling
+from afantasia.generators.spell import NounIndex, WordTable, write_word_table
+from afantasia.generators.spell import generate_dataset as generate_spell_dataset
+from afantasia.generators.spell import generate_test_case as generate_spell_test_case
+
+
+def test_seeded_playout_replays_legally():
+    """Test that a seeded playout is a legal game ending in the returned board."""
+    board, moves = play_random_moves(60, random.Random(7))
+    assert 0 < len(moves) <= 60
+    assert moves == play_random_moves(60, random.Random(7))[1]
+
+    replay = chess.Board()
+    for move in moves:
+        assert replay.is_legal(move)
+        replay.push(move)
+    assert replay.fen() == board.fen()
+
+    position = generate_playable_position(random.Random(7))
+    replay = chess.Board()
+    for san in position["move_history"].split():
+        if not san.endswith("."):
+            replay.push_san(san)
+    assert replay.fen() == position["fen"]
+    assert position["legal_moves"] == [replay.san(m) for m in replay.legal_moves]
+
+
+def test_playable_position_gives_up_after_max_attempts(monkeypatch):
+    """Test that drawing only terminal positions raises once retries run out."""
+    attempts = []
+
+    def checkmate(rng=None):
+        attempts.append(rng)
+        return {"legal_moves": []}
+
+    monkeypatch.setattr(
+        "afantasia.generators.chess.generate_random_position", checkmate
+    )
+    with pytest.raises(RuntimeError, match="in 3 attempts"):
+        generate_playable_position(max_attempts=3)
+    assert len(attempts) == 3
+
+
+def test_chess_dataset_is_reproducible_from_seed():
+    """Test that the same seed produces the same chess dataset."""
+    first = generate_chess_dataset(num_cases=5, seed=42)
+    second = generate_chess_dataset(num_cases=5, seed=42)
+
+    assert json.dumps(first) == json.dumps(second)
+
+
+def test_chess_dataset_is_independent_of_worker_count():
+    """Test that parallel generation matches serial generation byte for byte."""
+    serial = generate_chess_dataset(num_cases=8, seed=7, workers=1)
+    parallel = generate_chess_dataset(num_cases=8, seed=7, workers=2)
+
+    assert json.dumps(serial) == json.dumps(parallel)
+
+
+def test_chess_dataset_prefix_is_stable():
+    """Test that a smaller dataset is a prefix of a larger one with the same seed."""
+    small = generate_chess_dataset(num_cases=3, seed=1)
+    large = generate_chess_dataset(num_cases=6, seed=1)
+
+    assert small == large[:3]
+
+
+def test_write_jsonl_reports_missing_codec(tmp_path, monkeypatch):
+    """Test that writing .zst without zstandard raises the ImportError."""
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+
+    with pytest.raises(ImportError, match="zstandard"):
+        write_jsonl([{"id": 1}], tmp_path / "cases.jsonl.zst")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_chess_dataset_streams_to_jsonl(tmp_path):
+    """Test that a streamed, compressed JSONL dataset holds the same cases."""
+    path = tmp_path / "chess.jsonl.gz"
+
+    num_cases = save_chess_dataset(iter_chess_dataset(num_cases=4, seed=3), str(path))
+
+    assert num_cases == 4
+    assert list(iter_jsonl(path)) == generate_chess_dataset(num_cases=4, seed=3)
+
+
+def test_sample_ids_are_content_addressed():
+    """Test that sample ids depend only on the sample content."""
+    word_data = {"definition": "a fruit", "backward": "elppa"}
+    first = generate_spell_test_case("apple", word_data)
+    second = generate_spell_test_case("apple", word_data)
+    other = generate_spell_test_case("apple", {**word_data, "definition": "a tree"})
+
+    assert first["id"] == second["id"]
+    assert first["id"] != other["id"]
+    assert first["id"] == content_id(first["input"], first["target"], first["metadata"])
+
+
+def test_repeated_samples_get_distinct_ids():
+    """Test that a dataset drawing the same cube twice still has unique ids."""
+    dataset = generate_cube_dataset(
+        num_cases=2500, min_rotations=1, max_rotations=1, seed=34
+    )
+    contents = [
+        content_id(case["input"], case["target"], case["metadata"]) for case in dataset
+    ]
+
+    assert len(set(contents)) < len(dataset)
+    assert len({case["id"] for case in dataset}) == len(dataset)
+    assert [case["id"] for case in dataset] == [
+        case["id"]
+        for case in generate_cube_dataset(
+            num_cases=2500, min_rotations=1, max_rotations=1, seed=34
+        )
+    ]
+
+
+def test_manifest_hash_is_independent_of_format(tmp_path):
+    """Test that the manifest hashes content, not the file format."""
+    json_path = tmp_path / "chess.json"
+    jsonl_path = tmp_path / "chess.jsonl.gz"
+    parameters = {"num_cases": 3, "seed": 9}
+
+    save_chess_dataset(
+        iter_chess_dataset(num_cases=3, seed=9),
+        str(json_path),
+        compact=True,
+        parameters=parameters,
+    )
+    save_chess_dataset(
+        iter_chess_dataset(num_cases=3, seed=9), str(jsonl_path), parameters=parameters
+    )
+
+    json_manifest = read_manifest(json_path)
+    jsonl_manifest = read_manifest(jsonl_path)
+    assert json_manifest["sha256"] == jsonl_manifest["sha256"]
+    assert json_manifest["num_samples"] == 3
+    assert json_manifest["parameters"] == {**parameters, "compact": True}
+
+
+def test_position_bank_grows_incrementally(tmp_path):
+    """Test that a bank grown in steps matches one built in a single step."""
+    stepwise = tmp_path / "stepwise.bank"
+    grow_bank(stepwise, 3, seed=11)
+    assert grow_bank(stepwise, 2) == 5
+
+    single = tmp_path / "single.bank"
+    grow_bank(single, 5, seed=11)
+
+    with PositionBank(stepwise) as a, PositionBank(single) as b:
+        assert len(a) == len(b) == 5
+        assert [a[i] for i in range(5)] == [b[i] for i in range(5)]
+
+
+def test_chess_dataset_from_bank(tmp_path):
+    """Test that datasets sampled from a bank are reproducible and well formed."""
+    bank = tmp_path / "chess.bank"
+    grow_bank(bank, 6, seed=3)
+
+    first = generate_chess_dataset(num_cases=4, seed=9, bank=bank)
+    second = generate_chess_dataset(num_cases=4, seed=9, bank=bank)
+
+    assert first == second
+    assert len({case["metadata"]["fen"] for case in first}) == 4
+    for case in first:
+        assert case["target"]
+
+
+def test_cube_group_has_24_orientations():
+    """Test that the rotation group is closed and has 24 elements."""
+    assert cube_group.NUM_ORIENTATIONS == 24
+    assert len({tuple(perm) for perm in cube_group.ORIENTATIONS.tolist()}) == 24
+    assert set(np.unique(cube_group.COMPOSE)) == set(range(24))
+
+
+def test_cube_group_batch_matches_reference_cube():
+    """Test that batch-solved cubes match the reference Cube implementation."""
+    batch = cube_group.generate_batch(200, min_rotations=0, max_rotations=6, rng=0)
+
+    for case in cube_group.batch_to_test_cases(batch):
+        metadata = case["metadata"]
+        cube = Cube(
+            faces={
+                Face(face): Color(color)
+                for face, color in metadata["initial_state"].items()
+            }
+        )
+        for rotation in metadata["rotations"]:
+            cube.rotate(Axis(rotation["axis"]), Direction(rotation["direction"]))
+
+        final_state = {face.value: color.value for face, color in cube.faces.items()}
+        assert final_state == metadata["final_state"]
+        assert case["target"] in final_state.values()
+
+
+def test_sequence_index_matches_batch_solver():
+    """Test that indexed orientations match solving the decoded sequences."""
+    index = cube_group.SequenceIndex(3)
+
+    for code, orientation in enumerate(index.orientations[3]):
+        moves = [
+            cube_group.MOVES.index(move) for move in cube_group.decode_sequence(code, 3)
+        ]
+        assert cube_group.solve(np.array([moves], dtype=np.int8))[0] == orientation
+
+
+def test_stratified_cube_dataset_skips_trivial_sequences():
+    """Test that stratified sampling never draws sequences below min_distance."""
+    dataset = generate_cube_dataset(
+        num_cases=50, min_rotations=1, max_rotations=4, stratify=True, min_distance=1
+    )
+
+    for case in dataset:
+        metadata = case["metadata"]
+        moves = [
+            cube_group.MOVES.index((Axis(r["axis"]), Direction(r["direction"])))
+            for r in metadata["rotations"]
+        ]
+        orientation = cube_group.solve(np.array([moves], dtype=np.int8))[0]
+        assert cube_group.DISTANCE[orientation] >= 1
+        assert metadata["num_rotations"] == len(moves)
+
+
+NOUNS = {
+    word: {
+        "definition": f"definition of {word}",
+        "synset_id": f"{word}.n.01",
+        "frequency": frequency,
+        "backward": word[::-1],
+    }
+    for word, frequency in [
+        ("zebra", 20),
+        ("apple", 5),
+        ("mango", 60),
+        ("kiwi", 30),
+        ("banana", 30),
+    ]
+}
+
+
+def test_noun_index_range_query():
+    """Test that noun index queries filter by length and frequency in order."""
+    index = NounIndex(NOUNS)
+
+    assert list(index.query(5, 6, 5, 50)) == ["zebra", "apple", "banana"]
+    assert list(index.query(4, 5, 10, 0)) == ["zebra", "mango", "kiwi"]
+    assert index.query(6, 6, 0, 50)["banana"] == NOUNS["banana"]
+
+
+def test_word_table_matches_noun_index(tmp_path):
+    """Test that a word table answers queries like the index it was built from."""
+    index = NounIndex(NOUNS)
+    path = tmp_path / "words.sqlite"
+    write_word_table(path, index, {"wordnet_version": "3.0"})
+
+    table = WordTable(path)
+    assert len(table) == len(NOUNS)
+    assert table.meta["wordnet_version"] == "3.0"
+    for params in [(5, 6, 5, 50), (4, 5, 10, 0), (1, 10, 0, 30)]:
+        assert table.query(*params) == index.query(*params)
+    table.close()
+
+
+def test_spell_dataset_from_word_table_skips_nltk(tmp_path):
+    """Test that generating from a word table never imports NLTK."""
+    path = tmp_path / "words.sqlite"
+    write_word_table(path, NounIndex(NOUNS))
+
+    dataset = generate_spell_dataset(
+        num_cases=2, min_frequency=0, max_frequency=0, word_table=path
+    )
+    assert len(dataset) == 2
+    for case in dataset:
+        assert case["target"] == case["metadata"]["word"][::-1]
+
+    code = (
+        "import sys; import afantasia.generators.spell; "
+        "assert 'nltk' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def wordnet_available():
+    """Return whether the WordNet corpus is installed, without downloading it."""
+    import nltk
+
+    try:
+        nltk.data.find("corpora/wordnet")
+    except LookupError:
+        return False
+    return True
+
+
+@pytest.mark.skipif(not wordnet_available(), reason="WordNet is not installed")
+def test_count_word_synsets_matches_wordnet():
+    """Test that synset counts from the lemma index match wn.synsets."""
+    from nltk.corpus import wordnet as wn
+
+    from afantasia.generators.lexicon import count_synsets_by_lemma, count_word_synsets
+
+    synset_counts = count_synsets_by_lemma()
+    words = ["axes", "geese", "leaves", "dogs", "better", "saw", "Mercury"]
+    for i, synset in enumerate(wn.all_synsets("n")):
+        if i % 500 == 0:
+            words.extend(synset.lemma_names())
+
+    for word in words:
+        assert count_word_synsets(word, synset_counts) == len(wn.synsets(word)), word
+
+
+def test_frequency_table_round_trip(tmp_path):
+    """Test that a written frequency table returns the same counts."""
+    counts = {"the": 69971, "zebra": 3, "café": 2, "a": 23073}
+    path = tmp_path / "words.freq"
+    write_frequency_table(path, counts)
+
+    table = FrequencyTable(path)
+    assert len(table) == len(counts)
+    for word, count in counts.items():
+        assert table[word] == count
+    assert table["missing"] == 0
+    assert table[""] == 0
+    table.close()
+
+
+def test_profiling_reports_phases_and_counters(tmp_path):
+    """Test that profiling collects generator phases and writes its reports."""
+    path = tmp_path / "profile.json"
+    stats_path = tmp_path / "profile.pstats"
+
+    with profiling(path, stats_path) as profile:
+        generate_cube_dataset(num_cases=20, min_rotations=2, max_rotations=2, seed=1)
+        generate_chess_dataset(num_cases=2, seed=1)
+
+    assert profile.counters["cube.test_cases"] == 20
+    assert profile.counters["cube.rotations"] == 40
+    assert profile.counters["chess.positions"] == 2
+
+    report = json.loads(path.read_text())
+    assert report["timers"]["chess.playout"]["calls"] >= 2
+    assert report["counters"]["chess.playout_plies"] > 0
+    assert pstats.Stats(str(stats_path)).total_calls > 0
+
+    # Outside the block nothing is collected
+    generate_cube_dataset(num_cases=5, seed=1)
+    assert profile.counters["cube.test_cases"] == 20
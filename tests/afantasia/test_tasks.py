@@ -1,9 +1,21 @@
 """Tests for task creation."""
 
+import gzip
+import json
 import os
+import random
+import time
 
 import pytest
-from afantasia.tasks import chess, cube, spell
+from afantasia.generators.chess import compact_test_case, generate_test_case
+from afantasia.generators.spell import NounIndex, write_word_table
+from afantasia.tasks import afantasia, chess, cube, spell
+from afantasia.tasks.chess import match_legal_move, record_to_sample
+from afantasia.tasks.concurrency import AIMDController
+from afantasia.tasks.spell import edit_distances, levenshtein
+from afantasia.tasks.stopping import wilson_interval
+from afantasia.tasks.streaming import answer_decided
+from afantasia.tasks.utils import load_dataset
 
 # Skip tests if dataset files don't exist
 SKIP_REASON = "Dataset files not found - run afantasia --generate-datasets first"
@@ -124,3 +136,248 @@ def test_spell_task_raises_without_dataset():
     """Test that spell task raises error when dataset is missing."""
     with pytest.raises(FileNotFoundError):
         spell(dataset_path="/nonexistent/path.json")
+
+
+def write_spell_dataset(path, words):
+    """Write a minimal spell dataset with one sample per word."""
+    records = [
+        {"id": word, "input": word, "target": word[::-1], "metadata": {"word": word}}
+        for word in words
+    ]
+    with open(path, "w") as f:
+        json.dump(records, f)
+
+
+def test_load_dataset_reuses_parsed_samples(tmp_path):
+    """Test that loading an unchanged file twice parses it once."""
+    path = tmp_path / "spell.json"
+    write_spell_dataset(path, ["apple", "pear"])
+
+    first = load_dataset("spell", str(path))
+    second = load_dataset("spell", str(path))
+
+    assert first is not second
+    assert first[0] is second[0]
+
+    first.shuffle(seed=0)
+    assert [sample.id for sample in second] == ["apple", "pear"]
+
+
+def test_load_dataset_rereads_changed_file(tmp_path):
+    """Test that a regenerated dataset file is parsed again."""
+    path = tmp_path / "spell.json"
+    write_spell_dataset(path, ["apple"])
+    assert len(load_dataset("spell", str(path))) == 1
+
+    write_spell_dataset(path, ["apple", "pear", "plum"])
+    os.utime(path, ns=(0, 0))
+
+    assert len(load_dataset("spell", str(path))) == 3
+
+
+def test_load_dataset_reads_compressed_jsonl(tmp_path):
+    """Test that gzipped JSONL datasets load like JSON datasets."""
+    json_path = tmp_path / "spell.json"
+    write_spell_dataset(json_path, ["apple", "pear"])
+    jsonl_path = tmp_path / "spell.jsonl.gz"
+    with gzip.open(jsonl_path, "wt") as f:
+        for record in json.loads(json_path.read_text()):
+            f.write(json.dumps(record) + "\n")
+
+    from_json = load_dataset("spell", str(json_path))
+    from_jsonl = load_dataset("spell", str(jsonl_path))
+
+    assert [s.model_dump() for s in from_jsonl] == [s.model_dump() for s in from_json]
+    assert from_jsonl.name == "spell"
+
+
+def sample_ids(task):
+    """Return the sample ids of a task's dataset."""
+    return [sample.id for sample in task.dataset]
+
+
+def test_procedural_tasks_are_reproducible_from_seed():
+    """Test that procedural datasets need no file and depend only on the seed."""
+    for make_task in [chess, cube]:
+        first = make_task(procedural=True, seed=5, n=3, dataset_path="/nonexistent")
+        second = make_task(procedural=True, seed=5, n=3)
+        other = make_task(procedural=True, seed=6, n=3)
+
+        assert len(first.dataset) == 3
+        assert sample_ids(first) == sample_ids(second)
+        assert sample_ids(first) != sample_ids(other)
+        assert first.dataset.name.endswith("-procedural-5")
+
+
+def test_procedural_spell_task_from_word_table(tmp_path):
+    """Test that the procedural spell task draws words from a word table."""
+    path = tmp_path / "words.sqlite"
+    nouns = {
+        word: {
+            "definition": f"definition of {word}",
+            "synset_id": f"{word}.n.01",
+            "frequency": 20,
+            "backward": word[::-1],
+        }
+        for word in ["zebra", "mango", "banana"]
+    }
+    write_word_table(path, NounIndex(nouns))
+
+    task = spell(procedural=True, seed=1, n=2, word_table=str(path))
+
+    assert len(task.dataset) == 2
+    assert sample_ids(task) == sample_ids(
+        spell(procedural=True, seed=1, n=2, word_table=str(path))
+    )
+    for sample in task.dataset:
+        assert sample.target == sample.metadata["word"][::-1]
+
+
+def test_wilson_interval_narrows_with_samples():
+    """Test that the accuracy interval is sensible at the extremes and narrows."""
+    low, high = wilson_interval(0, 40)
+    assert low == 0.0
+    assert 0 < high < 0.1
+
+    wide = wilson_interval(10, 20)
+    narrow = wilson_interval(100, 200)
+    assert wide[0] < 0.5 < wide[1]
+    assert narrow[1] - narrow[0] < wide[1] - wide[0]
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+
+
+async def test_aimd_controller_adapts_to_rate_limits():
+    """Test that concurrency grows on fast calls and halves when rate limited."""
+    controller = AIMDController("provider/model", initial=2, ceiling=4)
+
+    for _ in range(20):
+        await controller.acquire()
+        await controller.release(time.monotonic(), latency=0.1, retries=0)
+    assert controller.limit == 4
+
+    await controller.acquire()
+    await controller.release(time.monotonic(), latency=0.1, retries=1)
+    assert controller.limit == 2
+    assert [limit for _, limit in controller.trajectory] == [2, 3, 4, 2]
+
+
+AFTER_E4_D5 = "rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2"
+
+
+def test_match_legal_move_accepts_san_and_uci():
+    """Test that legal moves are accepted in SAN and UCI notation."""
+    assert match_legal_move(AFTER_E4_D5, "exd5") == "exd5"
+    assert match_legal_move(AFTER_E4_D5, "e4d5") == "exd5"
+    assert match_legal_move(AFTER_E4_D5, "Nf3") == "Nf3"
+    assert match_legal_move(AFTER_E4_D5, "Ngf3") == "Nf3"
+    assert match_legal_move(AFTER_E4_D5, "Nf3!") == "Nf3"
+
+
+def test_match_legal_move_rejects_illegal_moves():
+    """Test that illegal or malformed moves are rejected."""
+    assert match_legal_move(AFTER_E4_D5, "e2e4") is None
+    assert match_legal_move(AFTER_E4_D5, "xd5") is None
+    assert match_legal_move(AFTER_E4_D5, "O-O") is None
+    assert match_legal_move(AFTER_E4_D5, "Let") is None
+
+
+def test_match_legal_move_rejects_wrong_capture_and_check_signs():
+    """Test that capture and check signs must agree with the move."""
+    assert match_legal_move(AFTER_E4_D5, "xd4") is None
+    assert match_legal_move(AFTER_E4_D5, "Nxf3") is None
+    assert match_legal_move(AFTER_E4_D5, "ed5") is None
+    assert match_legal_move(AFTER_E4_D5, "Nf3+") is None
+    assert match_legal_move(AFTER_E4_D5, "Ngxf3") is None
+    assert match_legal_move(AFTER_E4_D5, "Qh5") == "Qh5"
+
+
+def test_match_legal_move_accepts_missing_check_suffix():
+    """Test that a checking move is accepted without its check sign."""
+    fen = "rnbqkbnr/ppp2ppp/8/3pp3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 0 3"
+    assert match_legal_move(fen, "Bb5") == "Bb5+"
+    assert match_legal_move(fen, "Bb5+") == "Bb5+"
+
+
+def test_match_legal_move_strict_requires_exact_san():
+    """Test that strict matching only accepts the exact SAN of a legal move."""
+    fen = "rnbqkbnr/ppp2ppp/8/3pp3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 0 3"
+    assert match_legal_move(fen, "Bb5+", strict=True) == "Bb5+"
+    assert match_legal_move(fen, "Bb5", strict=True) is None
+    assert match_legal_move(fen, "f1b5", strict=True) is None
+    assert match_legal_move(fen, "--", strict=True) is None
+    assert match_legal_move(fen, "Qh8", strict=True) is None
+
+
+def test_compact_chess_record_matches_full_record():
+    """Test that a compact chess record loads to the same prompt metadata."""
+    case = generate_test_case(random.Random(0))
+    full = record_to_sample(case)
+    compact = record_to_sample(compact_test_case(case))
+
+    assert compact.id == full.id
+    assert compact.input == full.input
+    assert compact.metadata == full.metadata
+    assert "target" not in compact_test_case(case)
+
+
+def reference_levenshtein(a, b):
+    """Compute the Levenshtein distance one cell at a time."""
+    row = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        previous, row = row, [i]
+        for j, char_b in enumerate(b, 1):
+            row.append(
+                min(
+                    previous[j] + 1,
+                    row[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+    return row[-1]
+
+
+def test_levenshtein_matches_reference():
+    """Test that the batch edit distance matches a cell-by-cell computation."""
+    rng = random.Random(0)
+    a = ["".join(rng.choices("abcé", k=rng.randint(0, 10))) for _ in range(500)]
+    b = ["".join(rng.choices("abcé", k=rng.randint(0, 10))) for _ in range(500)]
+
+    distances = levenshtein(a, b)
+
+    assert distances.tolist() == [reference_levenshtein(x, y) for x, y in zip(a, b)]
+
+
+def test_edit_distances_score_reversed_and_forward_answers():
+    """Test that edit distances are normalized and measured both ways."""
+    completions = ["ANSWER: airebis", "ANSWER: SIBERIA", "aierbis"]
+    reversed_distance, forward_distance = edit_distances(
+        completions, ["airebis"] * 3, ["siberia"] * 3
+    )
+
+    assert reversed_distance.tolist() == [0.0, 4 / 7, 2 / 7]
+    assert forward_distance[1] == 0.0
+
+
+def test_combined_task_interleaves_tasks():
+    """Test that the combined task alternates between tasks and tags each sample."""
+    task = afantasia(tasks="chess,cube", procedural=True, seed=2, n=3)
+
+    assert [sample.metadata["task"] for sample in task.dataset] == [
+        "chess",
+        "cube",
+    ] * 3
+    assert sample_ids(task)[::2] == sample_ids(chess(procedural=True, seed=2, n=3))
+    assert "task" not in next(iter(cube(procedural=True, seed=2, n=3).dataset)).metadata
+
+    with pytest.raises(ValueError, match="Unknown tasks: draughts"):
+        afantasia(tasks=["chess", "draughts"])
+
+
+def test_answer_decided_once_answer_line_has_a_tail():
+    """Test that streaming only stops once more text follows the answer line."""
+    assert not answer_decided("ANSWER: tac")
+    assert not answer_decided("ANSWER: tac\n\n")
+    assert not answer_decided("ANSWER:\ntac")
+    assert answer_decided("ANSWER: tac\nBecause")
+    assert answer_decided("ANSWER:\ntac\nBecause")
+    assert answer_decided("Let me think.\nThe")
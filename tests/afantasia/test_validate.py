@@ -0,0 +1,64 @@
+"""Tests for the dataset validator."""
+
+import json
+import random
+
+from afantasia.generators.chess import compact_test_case
+from afantasia.generators.chess import generate_test_case as generate_chess_case
+from afantasia.generators.cube import generate_test_case as generate_cube_case
+from afantasia.validate import (
+    validate_chess,
+    validate_cube,
+    validate_dataset,
+    validate_spell,
+)
+
+
+def test_validate_chess_accepts_generated_cases():
+    """Test that generated chess cases, full and compact, are valid."""
+    case = generate_chess_case(random.Random(0))
+
+    assert validate_chess(case) == []
+    assert validate_chess(compact_test_case(case)) == []
+
+
+def test_validate_chess_detects_wrong_target():
+    """Test that a target missing a legal move is reported."""
+    case = generate_chess_case(random.Random(0))
+    case["target"] = case["target"][1:]
+
+    assert validate_chess(case) == ["target does not match the legal moves"]
+
+
+def test_validate_cube_detects_wrong_final_state():
+    """Test that a final state the rotations do not produce is reported."""
+    case = generate_cube_case(3)
+    assert validate_cube(case) == []
+
+    final_state = case["metadata"]["final_state"]
+    final_state["front"], final_state["back"] = (
+        final_state["back"],
+        final_state["front"],
+    )
+    assert "rotations do not reproduce final_state" in validate_cube(case)
+
+
+def test_validate_spell_checks_reversal():
+    """Test that the spell target must be the word spelled backwards."""
+    assert validate_spell({"target": "tac", "metadata": {"word": "cat"}}) == []
+    assert validate_spell({"target": "cat", "metadata": {"word": "cat"}}) != []
+
+
+def test_validate_dataset_reports_failures_in_parallel(tmp_path):
+    """Test that the process pool reports the index and id of bad samples."""
+    dataset = [generate_cube_case(2) for _ in range(10)]
+    dataset[4]["target"] = "not a color"
+    path = tmp_path / "cube.json"
+    path.write_text(json.dumps(dataset))
+
+    num_records, failures = validate_dataset(path, "cube", workers=2, chunk_size=3)
+
+    assert num_records == 10
+    assert [(index, sample_id) for index, sample_id, _ in failures] == [
+        (4, dataset[4]["id"])
+    ]